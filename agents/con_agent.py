@@ -1,4 +1,5 @@
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import HumanMessage
 from llm import get_llm
 from debate_state import DebateState
@@ -56,19 +57,32 @@ llm = get_llm()
 con_chain = con_prompt | llm
 
 
-def con_node(state: DebateState) -> DebateState:
-    result = con_chain.invoke({
+def con_inputs(state: DebateState) -> dict:
+    return {
         "topic": state["topic"],
         "pro_argument": state.get("pro_argument") or "No prior argument.",
         "chat_history": state["chat_history"][-4:] if state.get("chat_history") else [],
         "con_persona": state["con_persona"],
         "pro_persona": state["pro_persona"],
-    })
-    print("\nCon's Argument:", result.content)
+    }
+
+
+def con_update(state: DebateState, content: str) -> DebateState:
+    print("\nCon's Argument:", content)
 
     return {
-        "con_argument": result.content,
-        "chat_history": [HumanMessage(content=result.content)],
+        "con_argument": content,
+        "chat_history": [HumanMessage(content=content)],
         "current_speaker": "pro",
         "round": state["round"] + 1,
     }
+
+
+def con_node(state: DebateState, config: RunnableConfig) -> DebateState:
+    result = con_chain.invoke(con_inputs(state), config)
+    return con_update(state, result.content)
+
+
+async def acon_node(state: DebateState, config: RunnableConfig) -> DebateState:
+    result = await con_chain.ainvoke(con_inputs(state), config)
+    return con_update(state, result.content)
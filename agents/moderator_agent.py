@@ -1,12 +1,25 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional
+
+from langchain_core.callbacks import BaseCallbackManager
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.config import get_stream_writer
+from cancellation import CancelToken, DebateCancelled
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from llm import get_llm
 from debate_state import DebateState
 
-moderator_prompt = ChatPromptTemplate.from_messages([
-    (
-        "system",
-        """
+MODERATOR_SYSTEM_PROMPT = """
 You are MODERATOR, a neutral judge.
 Your job:
 1. Summarize the debate so far in 2 sentences.
@@ -14,31 +27,499 @@ Your job:
 3. Declare a winner based on logic and evidence.
 4. Use a fair, professional tone.
 5. Address the pro agent as {pro_persona} and the con agent as {con_persona}.
-""",
-    ),
-    ("user", "Topic: {topic}"),
-    ("user", "Pro's final argument: {pro_argument}"),
-    ("user", "Con's final argument: {con_argument}"),
-    ("placeholder", "{chat_history}"),
-    ("user", "Now deliver your verdict:"),
-])
+"""
+
+# Appended to every system prompt, including replacements, so parse_verdict can read the result
+VERDICT_FORMAT = """
+End your verdict with exactly three lines:
+Fallacies: <comma-separated fallacy names, or None>
+Winner: <Pro, Con or Tie>
+Confidence: <0-100>%
+"""
+
+
+def build_moderator_prompt(system_prompt: str = MODERATOR_SYSTEM_PROMPT) -> ChatPromptTemplate:
+    """Moderator prompt with a replaceable system message (used for re-judging)."""
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt.rstrip() + "\n" + VERDICT_FORMAT),
+        ("user", "Topic: {topic}"),
+        ("user", "Pro's final argument: {pro_argument}"),
+        ("user", "Con's final argument: {con_argument}"),
+        ("placeholder", "{chat_history}"),
+        ("user", "Now deliver your verdict:"),
+    ])
+
+
+moderator_prompt = build_moderator_prompt()
 
 llm = get_llm()
 moderator_chain = moderator_prompt | llm
 
 
-def moderator_node(state: DebateState) -> DebateState:
-    result = moderator_chain.invoke({
+def moderator_inputs(state: DebateState) -> dict:
+    return {
         "topic": state["topic"],
         "pro_argument": state.get("pro_argument", "No prior argument."),
         "con_argument": state.get("con_argument", "No prior argument."),
-    "chat_history": state["chat_history"][-6:],
-    "pro_persona": state["pro_persona"],
-    "con_persona": state["con_persona"]
-    })
-    print("\nModerator's Verdict:", result.content)
+        "chat_history": state["chat_history"][-6:],
+        "pro_persona": state["pro_persona"],
+        "con_persona": state["con_persona"],
+    }
+
+
+def moderator_update(content: str) -> DebateState:
+    print("\nModerator's Verdict:", content)
     # Return the full state, updating moderator_verdict and chat_history
     return {
-        "moderator_verdict": result.content,
-        "chat_history": [HumanMessage(content=result.content)]
+        "moderator_verdict": content,
+        "chat_history": [HumanMessage(content=content)]
     }
+
+
+def moderator_node(state: DebateState, config: RunnableConfig) -> DebateState:
+    specs = judge_panel_specs(config)
+    if len(specs) > 1:
+        return moderator_update(_panel_verdict(state, config, specs))
+    result = moderator_chain.invoke(moderator_inputs(state), config)
+    return moderator_update(result.content)
+
+
+async def amoderator_node(state: DebateState, config: RunnableConfig) -> DebateState:
+    specs = judge_panel_specs(config)
+    if len(specs) > 1:
+        return moderator_update(await _apanel_verdict(state, config, specs))
+    result = await moderator_chain.ainvoke(moderator_inputs(state), config)
+    return moderator_update(result.content)
+
+
+# ----------------------------
+# Verdict parsing
+# ----------------------------
+FALLACIES = [
+    "straw man", "ad hominem", "false dilemma", "false dichotomy", "slippery slope",
+    "red herring", "hasty generalization", "circular reasoning", "begging the question",
+    "appeal to emotion", "appeal to authority", "appeal to popularity", "appeal to ignorance",
+    "appeal to tradition", "tu quoque", "whataboutism", "false cause", "post hoc",
+    "bandwagon", "cherry picking", "non sequitur", "loaded question", "no true scotsman",
+    "moving the goalposts", "equivocation", "false equivalence",
+]
+_FALLACY_RE = re.compile(
+    "|".join(re.escape(f).replace(r"\ ", r"[\s-]?") for f in FALLACIES), re.IGNORECASE
+)
+_WINNER_LINE_RE = re.compile(r"^\W*winner\W*[:\-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_WINNER_SIDE_RE = re.compile(r"^\W*(pro|con|tie)\b", re.IGNORECASE)
+_FALLACIES_LINE_RE = re.compile(r"^\W*fallac(?:y|ies)\W*[:\-]\s*(.*)$", re.IGNORECASE | re.MULTILINE)
+_NEGATION_RE = re.compile(r"\b(?:no|not|none|never|without|nor|avoided|free of)\b", re.IGNORECASE)
+_NAME_STOPWORDS = {"the", "of", "and", "a", "an", "de", "van", "von", "mr", "mrs", "ms", "dr", "sir"}
+_WIN_WORD_RE = re.compile(r"\b(?:winner|wins|won|victor|prevails)\b", re.IGNORECASE)
+_WIN_SENTENCE_RE = re.compile(r"[^.!?\n]*\b(?:winner|wins|won|victor|prevails)\b[^.!?\n]*", re.IGNORECASE)
+_CONFIDENCE_RE = re.compile(r"confidence\W*[:\-]?\s*(\d+(?:\.\d+)?)\s*(%)?", re.IGNORECASE)
+_STRUCTURED_LINE_RE = re.compile(r"^\W*(?:winner|fallac(?:y|ies)|confidence)\W*[:\-].*$\n?", re.IGNORECASE | re.MULTILINE)
+_TIE_RE = re.compile(r"\b(?:tie|draw|no clear winner)\b", re.IGNORECASE)
+
+
+@dataclass
+class Verdict:
+    winner: Optional[str]            # "pro", "con", "tie", or None if unparseable
+    # From the "Fallacies:" line when present, else raw keyword hits in non-negated sentences
+    fallacies: list[str] = field(default_factory=list)
+    confidence: Optional[float] = None  # 0.0–1.0
+
+
+def _persona_aliases(persona: str) -> set[str]:
+    """Ways a judge may refer to a persona: the full string, the parts outside and
+    inside parentheses, and each significant word ("Dwayne Johnson (The Rock)" ->
+    "Dwayne Johnson", "The Rock", "Dwayne", "Johnson", "Rock")."""
+    outside = re.sub(r"\([^)]*\)", " ", persona).strip()
+    parts = [outside, *re.findall(r"\(([^)]*)\)", persona)]
+    aliases = {persona, *parts}
+    for part in parts:
+        aliases.update(w for w in re.findall(r"[\w'.-]+", part) if len(w) > 2 and w.lower() not in _NAME_STOPWORDS)
+    return {a.strip() for a in aliases if a.strip()}
+
+
+def _side_named(text: str, pro_persona: str, con_persona: str, near: Optional[tuple[int, int]] = None) -> Optional[str]:
+    """The side named in ``text``: the one closest to the ``near`` span if given, else the first named."""
+    if _TIE_RE.search(text):
+        return "tie"
+    pro_aliases = _persona_aliases(pro_persona or "")
+    con_aliases = _persona_aliases(con_persona or "")
+    shared = {a.lower() for a in pro_aliases} & {a.lower() for a in con_aliases}
+    pro_names = [n for n in pro_aliases if n.lower() not in shared] + ["pro"]
+    con_names = [n for n in con_aliases if n.lower() not in shared] + ["con"]
+    found = {}
+    for side, names in (("pro", pro_names), ("con", con_names)):
+        hits = [m.span() for n in names for m in re.finditer(rf"(?<!\w){re.escape(n)}(?!\w)", text, re.IGNORECASE)]
+        if hits:
+            found[side] = min(hits, key=lambda span: (_gap(span, near), span[0]) if near else span[0])
+    if len(found) == 1:
+        return next(iter(found))
+    if found:
+        # Both named: "the winner is X" names X next to the keyword, "X wins over Y" names it first
+        return min(found, key=lambda side: (_gap(found[side], near), found[side][0]) if near else found[side][0])
+    return None
+
+
+def _gap(span: tuple[int, int], near: tuple[int, int]) -> int:
+    """Characters between two spans of the same text."""
+    return max(near[0] - span[1], span[0] - near[1], 0)
+
+
+def parse_verdict(text: str, pro_persona: str, con_persona: str) -> Verdict:
+    """Extract winner, named fallacies and confidence from a free-text verdict."""
+    winner = None
+    try:
+        data = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        winner = _side_named(str(data.get("winner", "")), pro_persona, con_persona)
+    except (ValueError, AttributeError):
+        pass
+    line = _WINNER_LINE_RE.findall(text)
+    if winner is None and line:
+        side = _WINNER_SIDE_RE.match(line[-1])
+        winner = side.group(1).lower() if side else _side_named(line[-1], pro_persona, con_persona)
+    if winner is None:
+        for sentence in reversed(_WIN_SENTENCE_RE.findall(text)):
+            winner = _side_named(sentence, pro_persona, con_persona, _WIN_WORD_RE.search(sentence).span())
+            if winner:
+                break
+
+    fallacies_line = _FALLACIES_LINE_RE.findall(text)
+    if fallacies_line:
+        sources = [fallacies_line[-1]]
+    else:
+        # No requested line: keyword hits, skipping "no ad hominem was used"-style sentences
+        sources = [s for s in re.split(r"[.!?\n]+", text) if not _NEGATION_RE.search(s)]
+    fallacies = []
+    for source in sources:
+        for m in _FALLACY_RE.finditer(source):
+            name = re.sub(r"[\s-]+", " ", m.group(0).lower())
+            if name not in fallacies:
+                fallacies.append(name)
+
+    confidence = None
+    # The last match: the requested closing line, not an earlier "no confidence in..." aside
+    m = next(reversed(list(_CONFIDENCE_RE.finditer(text))), None)
+    if m:
+        value = float(m.group(1))
+        confidence = min(value / 100 if m.group(2) or value > 1 else value, 1.0)
+
+    return Verdict(winner=winner, fallacies=fallacies, confidence=confidence)
+
+
+# ----------------------------
+# Judge panel
+# ----------------------------
+# Seconds between "progress" events while a panel deliberates
+PROGRESS_INTERVAL = 0.1
+
+
+@dataclass
+class JudgeVote:
+    judge: int
+    label: str
+    verdict: Optional[Verdict] = None   # None if the judge was stopped early or failed
+    content: str = ""
+    seconds: float = 0.0
+    stopped: bool = False
+    error: str = ""
+
+
+@dataclass
+class PanelResult:
+    winner: Optional[str]            # "pro", "con", "tie", or None if no judge named a winner
+    votes: list[JudgeVote]
+    seconds: float
+
+    @property
+    def calls_saved(self) -> int:
+        return sum(v.stopped for v in self.votes)
+
+
+def judge_panel_specs(config: Optional[RunnableConfig] = None) -> list[Optional[str]]:
+    """Judge model specs from ``configurable.judge_panel`` or the ``JUDGE_PANEL`` env var.
+
+    Either a judge count (``"5"``, all on the default model) or a comma-separated
+    list of ``get_llm`` specs (``"openai:gpt-4o-mini,groq:llama-3.3-70b-versatile"``).
+    """
+    panel = ((config or {}).get("configurable") or {}).get("judge_panel") or os.environ.get("JUDGE_PANEL", "")
+    panel = str(panel).strip()
+    if not panel:
+        return [None]
+    if panel.isdigit():
+        return [None] * max(int(panel), 1)
+    return [spec.strip() or None for spec in panel.split(",")]
+
+
+@lru_cache(maxsize=None)
+def judge_chain(spec: Optional[str]):
+    return moderator_chain if spec is None else moderator_prompt | get_llm(spec)
+
+
+def with_handler(callbacks, handler):
+    """``callbacks`` (a list or a callback manager) plus ``handler``, without mutating it."""
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+        return callbacks
+    return [*(callbacks or []), handler]
+
+
+def decided_winner(counts: Counter, remaining: int) -> Optional[str]:
+    """The leading side once the judges still running can no longer overturn it."""
+    if not counts:
+        return None
+    ranked = counts.most_common(2)
+    lead = ranked[0][1]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0
+    return ranked[0][0] if lead > runner_up + remaining else None
+
+
+def _judge_config(config: RunnableConfig, i: int, cancel: Optional[CancelToken] = None) -> RunnableConfig:
+    callbacks = with_handler(config.get("callbacks"), cancel) if cancel else config.get("callbacks")
+    # "nostream" keeps judges' interleaved tokens out of the graph's message stream
+    return {**config, "callbacks": callbacks, "tags": [*config.get("tags", []), "nostream"], "run_name": f"judge-{i + 1}"}
+
+
+class _PanelTally:
+    """Votes collected so far by run_panel or arun_panel."""
+
+    def __init__(self, judges: list[tuple[str, object]], pro_persona: str, con_persona: str,
+                 on_vote: Optional[Callable[[JudgeVote], None]], early_stop: bool):
+        self.votes = [JudgeVote(judge=i + 1, label=label) for i, (label, _) in enumerate(judges)]
+        self.pro_persona, self.con_persona = pro_persona, con_persona
+        self.on_vote = on_vote
+        self.early_stop = early_stop
+        self.counts: Counter = Counter()
+        self.winner: Optional[str] = None
+        self.recorded = 0
+        self.started = time.perf_counter()
+
+    def record(self, i: int, content: str = "", error: Optional[BaseException] = None, stopped: bool = False) -> bool:
+        """Record judge ``i``'s outcome; True when this vote decides the majority."""
+        vote = self.votes[i]
+        vote.seconds = time.perf_counter() - self.started
+        self.recorded += 1
+        if stopped:
+            vote.stopped = True
+            return False
+        if error is not None:
+            vote.error = str(error)
+            return False
+        vote.content = content
+        vote.verdict = parse_verdict(content, self.pro_persona, self.con_persona)
+        if vote.verdict.winner:
+            self.counts[vote.verdict.winner] += 1
+        if self.on_vote:
+            self.on_vote(vote)
+        if self.winner is None and self.early_stop:
+            self.winner = decided_winner(self.counts, len(self.votes) - self.recorded)
+            return self.winner is not None
+        return False
+
+    def result(self) -> PanelResult:
+        if not any(v.verdict for v in self.votes):
+            raise RuntimeError("All judges failed: " + "; ".join(v.error for v in self.votes if v.error))
+        winner = self.winner
+        if winner is None:
+            ranked = self.counts.most_common(2)
+            if ranked:
+                winner = "tie" if len(ranked) > 1 and ranked[0][1] == ranked[1][1] else ranked[0][0]
+        return PanelResult(winner=winner, votes=self.votes, seconds=time.perf_counter() - self.started)
+
+
+def run_panel(
+    judges: list[tuple[str, object]],
+    inputs: dict,
+    pro_persona: str,
+    con_persona: str,
+    config: Optional[RunnableConfig] = None,
+    on_vote: Optional[Callable[[JudgeVote], None]] = None,
+    early_stop: bool = True,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> PanelResult:
+    """Run moderator chains concurrently and stop the rest once the majority is decided.
+
+    ``judges`` is a list of ``(label, chain)`` pairs. Stopped judges are cancelled
+    through their CancelToken, which aborts their streaming request within one chunk.
+    ``on_progress`` gets the number of judges done every PROGRESS_INTERVAL while they run.
+    """
+    config = config or {}
+    tokens = [CancelToken() for _ in judges]
+    tally = _PanelTally(judges, pro_persona, con_persona, on_vote, early_stop)
+
+    def run_judge(i: int) -> str:
+        return judges[i][1].invoke(inputs, _judge_config(config, i, tokens[i])).content
+
+    with ContextThreadPoolExecutor(max_workers=len(judges)) as pool:
+        futures = {pool.submit(run_judge, i): i for i in range(len(judges))}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures[future]
+                try:
+                    content = future.result()
+                except DebateCancelled:
+                    if not tokens[i].cancelled:
+                        raise  # The whole debate was cancelled, not just this judge
+                    tally.record(i, stopped=True)
+                    continue
+                except Exception as e:
+                    tally.record(i, error=e)
+                    continue
+                if tally.record(i, content):
+                    for other in pending:
+                        tokens[futures[other]].cancel("Panel majority reached")
+            if on_progress and pending:
+                on_progress(tally.recorded)
+    return tally.result()
+
+
+async def arun_panel(
+    judges: list[tuple[str, object]],
+    inputs: dict,
+    pro_persona: str,
+    con_persona: str,
+    config: Optional[RunnableConfig] = None,
+    on_vote: Optional[Callable[[JudgeVote], None]] = None,
+    early_stop: bool = True,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> PanelResult:
+    """Async run_panel: each judge is a task on the running loop, stopped with ``task.cancel()``.
+
+    Cancelling the caller cancels every judge still running.
+    """
+    config = config or {}
+    tally = _PanelTally(judges, pro_persona, con_persona, on_vote, early_stop)
+    tasks = {asyncio.create_task(chain.ainvoke(inputs, _judge_config(config, i))): i for i, (_, chain) in enumerate(judges)}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=PROGRESS_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = tasks[task]
+                if task.cancelled():
+                    tally.record(i, stopped=True)
+                    continue
+                error = task.exception()
+                if isinstance(error, DebateCancelled):
+                    raise error  # The whole debate was cancelled through its token
+                if error is not None:
+                    tally.record(i, error=error)
+                elif tally.record(i, task.result().content):
+                    for other in pending:
+                        other.cancel()
+            if on_progress and pending:
+                on_progress(tally.recorded)
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return tally.result()
+
+
+def _rationale(content: str) -> str:
+    """A judge's reasoning without its closing Fallacies/Winner/Confidence lines."""
+    return _STRUCTURED_LINE_RE.sub("", content).strip()
+
+
+def _summary(content: str, sentences: int = 2) -> str:
+    text = " ".join(_rationale(content).split())
+    return " ".join(re.split(r"(?<=[.!?])\s+", text)[:sentences])
+
+
+def merge_panel_verdict(result: PanelResult, pro_persona: str, con_persona: str) -> str:
+    """One verdict from the panel: the majority's rationale and a short summary of each dissent.
+
+    Judges' full texts are not repeated here; they are in the ``vote`` stream events.
+    """
+    names = {"pro": pro_persona, "con": con_persona, "tie": "Tie"}
+    voted = [v for v in result.votes if v.verdict]
+    counts = Counter(v.verdict.winner for v in voted if v.verdict.winner)
+    ranked = counts.most_common(2)
+    split = len(ranked) > 1 and ranked[0][1] == ranked[1][1]
+    # No majority opinion when nobody named a winner or the top sides drew level
+    majority = [] if split or result.winner is None else [v for v in voted if v.verdict.winner == result.winner]
+    lead = max(majority, key=lambda v: v.verdict.confidence or 0.0, default=None)
+
+    if result.winner is None:
+        header = f"Panel verdict: undecided — none of the {len(voted)} judges who answered named a winner."
+    elif split:
+        tally = ", ".join(f"{n} for {names[side]}" for side, n in counts.most_common())
+        header = f"Panel verdict: Tie — the judges were split ({tally})."
+    elif result.winner == "tie":
+        header = f"Panel verdict: Tie ({len(majority)} of {len(result.votes)} judges called it even)."
+    else:
+        header = f"Panel verdict: {names[result.winner]} wins ({len(majority)} of {len(result.votes)} judges)."
+    if result.calls_saved:
+        header += f" {result.calls_saved} remaining judge(s) stopped once the majority was decided."
+
+    fallacies = []
+    for v in voted:
+        fallacies += [f for f in v.verdict.fallacies if f not in fallacies]
+    confidences = [v.verdict.confidence for v in voted if v.verdict.confidence is not None]
+
+    parts = [header]
+    if fallacies:
+        parts.append("Fallacies noted: " + ", ".join(fallacies) + ".")
+    if lead:
+        parts.append(f"Majority opinion (Judge {lead.judge}, {lead.label}):\n{_rationale(lead.content)}")
+        concurring = [str(v.judge) for v in majority if v is not lead]
+        if concurring:
+            parts.append("Concurring: Judge " + ", ".join(concurring) + ".")
+    others = [v for v in voted if v not in majority]
+    if others:
+        lines = []
+        for v in others:
+            side = f"for {names[v.verdict.winner]}" if v.verdict.winner else "no clear vote"
+            lines.append(f"- Judge {v.judge} ({v.label}), {side}: {_summary(v.content)}")
+        parts.append(("Dissent:" if lead else "Judges:") + "\n" + "\n".join(lines))
+    parts.append(f"Winner: {names[result.winner] if result.winner else 'Undecided'}")
+    if confidences:
+        parts.append(f"Confidence: {round(100 * sum(confidences) / len(confidences))}%")
+    return "\n\n".join(parts)
+
+
+class _PanelStream:
+    """Writes a panel's vote, progress and verdict events to the graph's custom stream."""
+
+    def __init__(self, state: DebateState, panel_size: int):
+        self.writer = get_stream_writer()
+        self.state = state
+        self.panel_size = panel_size
+
+    def vote(self, vote: JudgeVote) -> None:
+        self.writer({
+            "type": "vote",
+            "judge": vote.judge,
+            "label": vote.label,
+            "winner": vote.verdict.winner,
+            "confidence": vote.verdict.confidence,
+            "panel_size": self.panel_size,
+            "content": vote.content,
+        })
+
+    def progress(self, voted: int) -> None:
+        # Judges don't stream tokens to the graph; this keeps consumers hearing from the run
+        self.writer({"type": "progress", "voted": voted, "panel_size": self.panel_size})
+
+    def verdict(self, result: PanelResult) -> str:
+        content = merge_panel_verdict(result, self.state["pro_persona"], self.state["con_persona"])
+        self.writer({"type": "verdict", "content": content, "calls_saved": result.calls_saved, "seconds": result.seconds})
+        return content
+
+
+def _panel_verdict(state: DebateState, config: RunnableConfig, specs: list[Optional[str]]) -> str:
+    judges = [(spec or "default", judge_chain(spec)) for spec in specs]
+    stream = _PanelStream(state, len(judges))
+    result = run_panel(judges, moderator_inputs(state), state["pro_persona"], state["con_persona"], config,
+                       stream.vote, on_progress=stream.progress)
+    return stream.verdict(result)
+
+
+async def _apanel_verdict(state: DebateState, config: RunnableConfig, specs: list[Optional[str]]) -> str:
+    judges = [(spec or "default", judge_chain(spec)) for spec in specs]
+    stream = _PanelStream(state, len(judges))
+    result = await arun_panel(judges, moderator_inputs(state), state["pro_persona"], state["con_persona"], config,
+                              stream.vote, on_progress=stream.progress)
+    return stream.verdict(result)
@@ -1,4 +1,5 @@
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import HumanMessage
 from llm import get_llm
 from debate_state import DebateState
@@ -56,18 +57,31 @@ llm = get_llm()
 pro_chain = pro_prompt | llm
 
 
-def pro_node(state: DebateState) -> DebateState:
-    result = pro_chain.invoke({
+def pro_inputs(state: DebateState) -> dict:
+    return {
         "topic": state["topic"],
         "con_argument": state.get("con_argument") or "No prior argument.",
         "chat_history": state["chat_history"][-4:] if state.get("chat_history") else [],
         "pro_persona": state["pro_persona"],
         "con_persona": state["con_persona"],
-    })
-    print("\nPro's Argument:", result.content)
+    }
+
+
+def pro_update(content: str) -> DebateState:
+    print("\nPro's Argument:", content)
 
     return {
-        "pro_argument": result.content,
-        "chat_history": [HumanMessage(content=result.content)],
+        "pro_argument": content,
+        "chat_history": [HumanMessage(content=content)],
         "current_speaker": "con",
     }
+
+
+def pro_node(state: DebateState, config: RunnableConfig) -> DebateState:
+    result = pro_chain.invoke(pro_inputs(state), config)
+    return pro_update(result.content)
+
+
+async def apro_node(state: DebateState, config: RunnableConfig) -> DebateState:
+    result = await pro_chain.ainvoke(pro_inputs(state), config)
+    return pro_update(result.content)
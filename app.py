@@ -5,10 +5,13 @@ Streamlit front-end for AI Debate Club.
 from __future__ import annotations
 
 import html as html_lib
+import os
 from langchain_core.messages import AIMessageChunk
 
 import streamlit as st
 
+import profiling
+
 # ----------------------------
 # Page config
 # ----------------------------
@@ -238,6 +241,17 @@ def _e(s: str) -> str:
     return html_lib.escape(s or "")
 
 
+# Judge count or comma-separated model specs (see agents/moderator_agent.py)
+JUDGE_PANEL = os.environ.get("JUDGE_PANEL", "").strip()
+
+
+def env_judge_count() -> int:
+    """Panel size configured by JUDGE_PANEL; the Judges slider starts there."""
+    if not JUDGE_PANEL:
+        return 1
+    return max(int(JUDGE_PANEL), 1) if JUDGE_PANEL.isdigit() else len(JUDGE_PANEL.split(","))
+
+
 def bubble_html(content: str, role: str, persona: str, streaming: bool = False) -> str:
     safe = _e(content).replace("\n", "<br>")
     cursor = '<span class="cursor">▌</span>' if streaming else ""
@@ -279,7 +293,8 @@ def render_history(messages: list[dict]) -> None:
         if msg["speaker"] != "moderator" and r != last_round:
             st.markdown(round_divider_html(r), unsafe_allow_html=True)
             last_round = r
-        st.markdown(bubble_html(msg["content"], msg["speaker"], msg.get("persona", "")), unsafe_allow_html=True)
+        content = msg["content"] + (" … (stopped)" if msg.get("interrupted") else "")
+        st.markdown(bubble_html(content, msg["speaker"], msg.get("persona", "")), unsafe_allow_html=True)
 
 
 # ----------------------------
@@ -289,6 +304,12 @@ with st.sidebar:
     st.markdown('<div style="font-size:0.9rem;font-weight:700;color:#e0e0e0;padding:0.25rem 0 0.75rem;">AI Debate Club</div>', unsafe_allow_html=True)
     st.markdown('<div class="sb-label">Rounds</div>', unsafe_allow_html=True)
     max_rounds = st.slider("Rounds", min_value=1, max_value=10, value=3, label_visibility="collapsed")
+    st.markdown('<div class="sb-label">Judges</div>', unsafe_allow_html=True)
+    env_judges = env_judge_count()
+    judge_panel = st.select_slider("Judges", options=sorted({1, 3, 5, 7, env_judges}), value=env_judges, label_visibility="collapsed",
+                                   help="Judges vote in parallel; the rest stop once a majority is decided.")
+    profile_run = st.toggle("Profile this run", value=profiling.enabled(),
+                            help="Sample CPU and allocations per phase; writes flamegraph and speedscope files.")
     st.markdown('<div class="sb-label">About</div>', unsafe_allow_html=True)
     st.markdown('<div style="font-size:0.75rem;color:#5a5a5a;line-height:1.6;">Two AI agents debate in persona, then a neutral moderator evaluates and declares a winner.</div>', unsafe_allow_html=True)
 
@@ -346,12 +367,28 @@ if "debate_personas" not in st.session_state:
     st.session_state.debate_personas = {"pro": "Pro", "con": "Con"}
 
 
+def request_stop() -> None:
+    # Runs before the rerun that interrupts the active debate
+    st.session_state.debate_stopped = True
+
+
 # ----------------------------
 # Debate runner — streams tokens live
 # ----------------------------
-def run_real_debate(topic: str, max_rounds: int, pro_persona: str, con_persona: str) -> bool:
+def show_profile(prof: "profiling.Profiler") -> None:
+    with st.expander("Profile", expanded=True):
+        st.code(prof.summary_table(), language=None)
+        st.caption(f"Saved to {prof.out_dir}")
+        speedscope = prof.out_dir / "profile.speedscope.json"
+        st.download_button("Download speedscope profile", speedscope.read_bytes(), file_name=speedscope.name)
+
+
+def run_real_debate(topic: str, max_rounds: int, pro_persona: str, con_persona: str, judge_panel: int | str = 1,
+                    profile: bool = False) -> bool:
     try:
         from graph import graph_app
+        from debate_state import initial_state
+        from cancellation import CancelToken
     except Exception as e:
         st.error(f"Error importing graph: {e}")
         return False
@@ -362,18 +399,10 @@ def run_real_debate(topic: str, max_rounds: int, pro_persona: str, con_persona:
     st.session_state.chat_messages = []
     st.session_state.debate_personas = {"pro": persona_pro, "con": persona_con}
 
-    state = {
-        "topic": topic,
-        "chat_history": [],
-        "pro_argument": "",
-        "con_argument": "",
-        "current_speaker": "pro",
-        "round": 0,
-        "max_rounds": int(max_rounds),
-        "pro_persona": persona_pro,
-        "con_persona": persona_con,
-    }
+    state = initial_state(topic, max_rounds, persona_pro, persona_con)
 
+    stop_ph      = st.empty()
+    stop_ph.button("Stop debate", key="stop_debate", on_click=request_stop, use_container_width=True)
     progress_bar = st.progress(0)
     status      = st.empty()
 
@@ -382,34 +411,73 @@ def run_real_debate(topic: str, max_rounds: int, pro_persona: str, con_persona:
     current_ph    = None   # st.empty() for the active streaming bubble
     pro_turn      = 0
     con_turn      = 0
+    completed     = False
 
-    def finish_turn():
+    def finish_turn(interrupted: bool = False):
         """Persist the completed turn to session state and finalize its placeholder."""
         nonlocal current_text, current_ph
         if not current_node or not current_text:
             return
+        # Clear first so an interruption mid-render can't persist the turn twice
+        text, current_text = current_text, ""
         role = current_node
         persona = persona_pro if role == "pro" else persona_con if role == "con" else ""
         round_num = pro_turn if role == "pro" else con_turn
         st.session_state.chat_messages.append({
             "speaker": role,
-            "content": current_text,
+            "content": text,
             "persona": persona,
             "round": round_num,
+            "interrupted": interrupted,
         })
-        if current_ph:
-            current_ph.markdown(bubble_html(current_text, role, persona, streaming=False), unsafe_allow_html=True)
+        # An interrupted script can't render any more; the rerun replays history instead
+        if current_ph and not interrupted:
+            current_ph.markdown(bubble_html(text, role, persona, streaming=False), unsafe_allow_html=True)
+
+    # Stop button, changed inputs and closed tabs all interrupt the script by raising
+    # Streamlit's StopException/RerunException out of the loop below. The token makes
+    # the graph and the provider stream stop too, instead of finishing in the background.
+    cancel = CancelToken()
+    # Always pass the panel, 1 included, so the sidebar choice overrides JUDGE_PANEL
+    config = {"callbacks": [cancel], "configurable": {"judge_panel": judge_panel}}
+    # Only a profiled run gets a Profiler; otherwise the loop iterates the raw stream
+    prof = profiling.Profiler("run_real_debate").start() if profile else None
+    if prof:
+        config["callbacks"].append(prof.callbacks)
+    stream = graph_app.stream(state, config, stream_mode=["messages", "custom"])
+    events = prof.iterate(stream) if prof else stream
 
     try:
-        for chunk, metadata in graph_app.stream(state, stream_mode="messages"):
-            node = metadata.get("langgraph_node", "")
-            if node not in ("pro", "con", "moderator"):
-                continue
-            if not isinstance(chunk, AIMessageChunk):
-                continue
-            token = chunk.content
-            if not isinstance(token, str) or not token:
-                continue
+        for mode, payload in events:
+            # Judge panel: votes update the status line, the merged verdict streams as one token
+            if mode == "custom":
+                if payload.get("type") == "vote":
+                    winner = {"pro": persona_pro, "con": persona_con, "tie": "a tie"}.get(payload["winner"], "no clear winner")
+                    status.markdown(
+                        f'<div class="status-line">Judge {payload["judge"]} of {payload["panel_size"]} votes for {_e(winner)}...</div>',
+                        unsafe_allow_html=True,
+                    )
+                    continue
+                if payload.get("type") == "progress":
+                    # Sent while judges deliberate, so a Stop click is noticed without waiting for a vote
+                    status.markdown(
+                        f'<div class="status-line">Judges deliberating: {payload["voted"]} of {payload["panel_size"]} voted...</div>',
+                        unsafe_allow_html=True,
+                    )
+                    continue
+                if payload.get("type") != "verdict":
+                    continue
+                node, token = "moderator", payload["content"]
+            else:
+                chunk, metadata = payload
+                node = metadata.get("langgraph_node", "")
+                if node not in ("pro", "con", "moderator"):
+                    continue
+                if not isinstance(chunk, AIMessageChunk):
+                    continue
+                token = chunk.content
+                if not isinstance(token, str) or not token:
+                    continue
 
             # ── Node transition ──────────────────────────────────────────
             if node != current_node:
@@ -446,6 +514,8 @@ def run_real_debate(topic: str, max_rounds: int, pro_persona: str, con_persona:
 
         # Finalize the last turn
         finish_turn()
+        completed = True
+        stop_ph.empty()
         status.empty()
         st.toast("Debate complete.", icon="⚖️")
 
@@ -453,6 +523,18 @@ def run_real_debate(topic: str, max_rounds: int, pro_persona: str, con_persona:
         st.error(f"Debate failed: {e}")
         return False
 
+    finally:
+        if not completed:
+            cancel.cancel()
+            finish_turn(interrupted=True)
+        # Waits at most one streamed chunk for the cancelled node to unwind
+        events.close()
+        stream.close()
+        if prof:
+            prof.stop()
+
+    if prof:
+        show_profile(prof)
     return True
 
 
@@ -467,6 +549,9 @@ if topic:
     </div>
     """, unsafe_allow_html=True)
 
+if st.session_state.pop("debate_stopped", False):
+    st.toast("Debate stopped.", icon="⏹️")
+
 # Replay previous session
 if st.session_state.chat_messages:
     render_history(
@@ -474,4 +559,6 @@ if st.session_state.chat_messages:
     )
 
 if start:
-    run_real_debate(topic, max_rounds, pro_persona, con_persona)
+    # An untouched slider keeps JUDGE_PANEL as configured, model specs included
+    panel = JUDGE_PANEL if JUDGE_PANEL and judge_panel == env_judges else judge_panel
+    run_real_debate(topic, max_rounds, pro_persona, con_persona, panel, profile_run)
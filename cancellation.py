@@ -0,0 +1,63 @@
+"""
+Cooperative cancellation for debate runs.
+
+A ``CancelToken`` is passed to the graph as a callback handler. Once cancelled,
+the next callback fired inside the run (node start, LLM start, or the next
+streamed token) raises ``DebateCancelled``. Raising from inside the provider's
+token loop unwinds its streaming generator, which closes the HTTP response, so
+generation stops within one chunk instead of running to completion.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class DebateCancelled(Exception):
+    """Raised inside a debate run after its CancelToken was cancelled."""
+
+
+class _HideCancellation(logging.Filter):
+    # langchain logs every error raised from a callback; cancellation is expected, not a failure
+    def filter(self, record: logging.LogRecord) -> bool:
+        return "DebateCancelled(" not in record.getMessage()
+
+
+logging.getLogger("langchain_core.callbacks.manager").addFilter(_HideCancellation())
+
+
+class CancelToken(BaseCallbackHandler):
+    # Callback errors are swallowed by default; we need ours to propagate
+    raise_error = True
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Debate stopped") -> None:
+        self.reason = reason
+        self._event.set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise DebateCancelled(self.reason)
+
+    def on_chain_start(self, serialized: Any, inputs: Any, **kwargs: Any) -> None:
+        self.check()
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any) -> None:
+        self.check()
+
+    def on_llm_start(self, serialized: Any, prompts: Any, **kwargs: Any) -> None:
+        self.check()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.check()
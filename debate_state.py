@@ -13,3 +13,18 @@ class DebateState(TypedDict):
     moderator_verdict: str
     pro_persona: str
     con_persona: str
+
+
+def initial_state(topic: str, max_rounds: int, pro_persona: str, con_persona: str) -> DebateState:
+    """Build the starting state shared by the Streamlit app and the API server."""
+    return {
+        "topic": topic,
+        "chat_history": [],
+        "pro_argument": "",
+        "con_argument": "",
+        "current_speaker": "pro",
+        "round": 0,
+        "max_rounds": int(max_rounds),
+        "pro_persona": pro_persona,
+        "con_persona": con_persona,
+    }
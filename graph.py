@@ -1,13 +1,15 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
-from agents.pro_agent import pro_node
-from agents.con_agent import con_node
-from agents.moderator_agent import moderator_node
+from agents.pro_agent import pro_node, apro_node
+from agents.con_agent import con_node, acon_node
+from agents.moderator_agent import moderator_node, amoderator_node
 from debate_state import DebateState
 
 graph = StateGraph(DebateState)
-graph.add_node("pro", pro_node)
-graph.add_node("con", con_node)
-graph.add_node("moderator", moderator_node)
+# Sync nodes serve graph_app.stream (Streamlit); async twins serve astream (server.py)
+graph.add_node("pro", RunnableLambda(pro_node, afunc=apro_node, name="pro"))
+graph.add_node("con", RunnableLambda(con_node, afunc=acon_node, name="con"))
+graph.add_node("moderator", RunnableLambda(moderator_node, afunc=amoderator_node, name="moderator"))
 
 graph.set_entry_point("pro")
 
@@ -1,30 +1,94 @@
+import asyncio
 import os
+import re
+import time
+from typing import Any, AsyncIterator, Iterator
 
-def get_llm():
-    """Helper to create the LLM instance. Defaults to OpenAI, falls back to Groq."""
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """Offline chat model that streams a canned reply word by word.
+
+    Enabled with ``DEBATE_FAKE_LLM=1``. ``token_delay`` simulates provider
+    latency between chunks so load tests exercise real streaming behaviour.
+    """
+
+    reply: str = (
+        "Ladies and gentlemen, let me be perfectly clear about this topic. "
+        "The evidence is overwhelming, the history is on my side, and my "
+        "opponent has not answered a single one of my points."
+    )
+    token_delay: float = 0.02
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _tokens(self) -> list[str]:
+        return [t for t in re.split(r"(\s)", self.reply) if t]
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _stream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for token in self._tokens():
+            time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for token in self._tokens():
+            await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def get_llm(spec: str | None = None):
+    """Helper to create the LLM instance. Defaults to OpenAI, falls back to Groq.
+
+    ``spec`` optionally pins a provider and model as ``"provider:model"``
+    (e.g. ``"groq:llama-3.1-8b-instant"``); either part may be left empty.
+    """
+    provider, _, model = (spec or "").partition(":")
+
+    # Offline fake provider for load tests and local development
+    if os.environ.get("DEBATE_FAKE_LLM"):
+        return FakeStreamingLLM(
+            token_delay=float(os.environ.get("DEBATE_FAKE_LLM_DELAY", "0.02")),
+            streaming=True
+        )
     
     # Try OpenAI first
     openai_key = os.environ.get("OPENAI_API_KEY")
-    if openai_key:
+    if openai_key and provider in ("", "openai"):
         from langchain_openai import ChatOpenAI
         return ChatOpenAI(
-            model="gpt-4o-mini",
+            model=model or "gpt-4o-mini",
             temperature=0.7,
             streaming=True
         )
 
     # Try Groq as fallback
     groq_key = os.environ.get("GROQ_API_KEY") or os.environ.get("HF_TOKEN") or os.environ.get("groq_key")
-    if groq_key:
+    if groq_key and provider in ("", "groq"):
         from langchain_groq import ChatGroq
         return ChatGroq(
             api_key=groq_key,
-            model="llama-3.3-70b-versatile",
+            model=model or "llama-3.3-70b-versatile",
             temperature=0.7,
             streaming=True
         )
         
     raise RuntimeError(
+        f"No API key found for {provider}. Please set its API key." if provider else
         "No API key found. Please set OPENAI_API_KEY or GROQ_API_KEY."
     )
 
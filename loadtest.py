@@ -0,0 +1,136 @@
+"""
+Local load test: concurrent debate streams per CPU core, API server vs Streamlit.
+
+Both paths run against the offline fake LLM (DEBATE_FAKE_LLM=1), so the numbers
+measure our own serving overhead rather than provider latency.
+
+    python loadtest.py --concurrency 50 --rounds 2
+    python loadtest.py --skip-streamlit
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _report(label: str, streams: int, wall: float, cpu: float) -> None:
+    cores = cpu / wall if wall else 0.0
+    per_core = streams / cores if cores else float("inf")
+    print(
+        f"{label:<10} streams={streams:<5} wall={wall:7.2f}s cpu={cpu:7.2f}s "
+        f"cores_used={cores:5.2f} "
+        f"concurrent_streams_per_core={per_core:8.1f}"
+    )
+
+
+async def _client(base_url: str, rounds: int, results: list[str]) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        r = await client.post("/debates", json={"topic": "Load test", "max_rounds": rounds})
+        r.raise_for_status()
+        debate_id = r.json()["id"]
+        async with client.stream("GET", f"/debates/{debate_id}/events") as stream:
+            async for line in stream.aiter_lines():
+                if line == "event: error":
+                    raise RuntimeError(f"debate {debate_id} failed")
+        results.append(debate_id)
+
+
+def run_server_load(concurrency: int, rounds: int, env: dict) -> None:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        env={**env, "DEBATE_MAX_CONCURRENCY": str(concurrency)},
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                # CPU baseline once the server is up, so import and startup aren't counted
+                cpu_before = httpx.get(f"{base_url}/health").json()["cpu_seconds"]
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("server did not start")
+
+        results: list[str] = []
+
+        async def main():
+            await asyncio.gather(*(_client(base_url, rounds, results) for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        wall = time.perf_counter() - start
+        cpu = httpx.get(f"{base_url}/health").json()["cpu_seconds"] - cpu_before
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    _report("server", len(results), wall, cpu)
+
+
+def run_streamlit_load(concurrency: int, rounds: int) -> None:
+    # One AppTest per simulated session mirrors Streamlit's script-thread-per-user model
+    from streamlit.testing.v1 import AppTest
+
+    finished: list[int] = []
+    errors: list[BaseException] = []
+
+    def session():
+        try:
+            at = AppTest.from_file("app.py", default_timeout=600)
+            at.run()
+            at.sidebar.slider[0].set_value(rounds)
+            at.button[0].click().run()
+            finished.append(len(at.session_state.chat_messages))
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session) for _ in range(concurrency)]
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    if errors:
+        print(f"streamlit  {len(errors)} sessions failed: {errors[0]!r}")
+    _report("streamlit", len(finished), wall, cpu)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous debates")
+    parser.add_argument("--rounds", type=int, default=1, help="rounds per debate")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="fake LLM seconds per token")
+    parser.add_argument("--skip-streamlit", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["DEBATE_FAKE_LLM"] = "1"
+    os.environ["DEBATE_FAKE_LLM_DELAY"] = str(args.token_delay)
+    run_server_load(args.concurrency, args.rounds, dict(os.environ))
+    if not args.skip_streamlit:
+        run_streamlit_load(args.concurrency, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
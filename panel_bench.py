@@ -0,0 +1,96 @@
+"""
+Judge panel benchmark: verdict latency against panel size, and calls saved by early stopping.
+
+Judges are fake streaming models with randomised per-token latency, each voting
+for Pro with probability ``--pro-bias``. For every panel size the script times
+three strategies on the same judges:
+
+    sequential   judges run one after another (the naive panel)
+    parallel     judges run concurrently, all to completion
+    early-stop   judges run concurrently, the rest stop once the majority is decided
+
+    python panel_bench.py --sizes 1 3 5 7 --trials 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DEBATE_FAKE_LLM", "1")
+
+from agents.moderator_agent import moderator_prompt, run_panel  # noqa: E402
+from debate_state import initial_state  # noqa: E402
+from llm import FakeStreamingLLM  # noqa: E402
+
+RATIONALE = (
+    "Both debaters were energetic. One side leaned on anecdote, the other on data, "
+    "and there was a clear straw man in the second round. On balance the evidence "
+    "favoured one position more than the other."
+)
+
+
+def make_judges(size: int, pro_bias: float, rng: random.Random) -> list[tuple[str, object]]:
+    judges = []
+    for i in range(size):
+        side = "Pro" if rng.random() < pro_bias else "Con"
+        llm = FakeStreamingLLM(
+            reply=f"{RATIONALE}\nWinner: {side}\nConfidence: {rng.randint(55, 95)}%",
+            token_delay=rng.uniform(0.002, 0.02),
+            streaming=True,
+        )
+        judges.append((f"fake-{i + 1}", moderator_prompt | llm))
+    return judges
+
+
+def bench(size: int, trials: int, pro_bias: float, seed: int) -> dict:
+    inputs = {
+        **initial_state("Benchmark topic", 1, "Pro", "Con"),
+        "pro_argument": "Pro's case.",
+        "con_argument": "Con's case.",
+    }
+    timings = {"sequential": [], "parallel": [], "early-stop": []}
+    saved = []
+    for trial in range(trials):
+        judges = make_judges(size, pro_bias, random.Random(seed + trial))
+
+        start = time.perf_counter()
+        for _, chain in judges:
+            chain.invoke(inputs)
+        timings["sequential"].append(time.perf_counter() - start)
+
+        timings["parallel"].append(run_panel(judges, inputs, "Pro", "Con", early_stop=False).seconds)
+
+        result = run_panel(judges, inputs, "Pro", "Con")
+        timings["early-stop"].append(result.seconds)
+        saved.append(result.calls_saved)
+
+    return {
+        "size": size,
+        **{name: statistics.mean(values) for name, values in timings.items()},
+        "calls_saved": statistics.mean(saved),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 3, 5, 7])
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--pro-bias", type=float, default=0.7, help="chance each judge votes Pro")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'judges':>6} {'sequential':>11} {'parallel':>9} {'early-stop':>11} {'calls saved':>12}")
+    for size in args.sizes:
+        row = bench(size, args.trials, args.pro_bias, args.seed)
+        print(
+            f"{row['size']:>6} {row['sequential']:>10.2f}s {row['parallel']:>8.2f}s "
+            f"{row['early-stop']:>10.2f}s {row['calls_saved']:>6.1f} / {size}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+On-demand profiling for debate runs.
+
+Enable with ``DEBATE_PROFILE=1`` (or the sidebar toggle in app.py, or
+``rejudge.py --profile``). When profiling is off no Profiler exists: no sampler
+thread, no tracemalloc, no callbacks and no wrapped iterators, so a normal run
+pays no overhead.
+
+A ``Profiler`` combines:
+  * a sampling profiler thread that snapshots every thread's stack at a fixed
+    interval, attributing each sample to the phase that thread is in (on an
+    event loop thread, the phase of the task running at that moment, or
+    "(loop idle)" while the loop waits on I/O);
+  * per-phase wall time, thread CPU time and ``tracemalloc`` net allocations;
+  * ``tracemalloc`` snapshots at the end of every graph node, diffed against
+    the previous one to show where each node allocated.
+
+Phases are "graph step" (waiting on the graph stream), "node:<name>",
+"llm" (inside a provider call) and "render" (the app's loop body: bubble HTML
+and Streamlit deltas).
+Phase times are inclusive: an "llm" phase also counts towards its node.
+Inside a running event loop (``rejudge.py``'s concurrent calls) phases are
+tracked per asyncio task through a context variable, which the tasks a call
+spawns inherit; elsewhere per thread.
+Concurrent tasks' phases overlap, so their wall times add up to more than the
+run, and their cpu is not measured: thread CPU time on the loop would include
+every other task.
+The sampler needs the GIL to take a sample, so short CPU-bound phases such as
+"render" are undersampled; the wall/cpu columns measure every phase exactly.
+
+Outputs, written to ``DEBATE_PROFILE_DIR`` (default ``profiles/<timestamp>``):
+  profile.collapsed         folded stacks for flamegraph.pl / inferno / speedscope
+  profile.speedscope.json   speedscope sampled profile, one per thread
+  summary.txt               per-phase summary table
+  allocations.txt           top allocation sites per node
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+SAMPLE_INTERVAL = float(os.environ.get("DEBATE_PROFILE_INTERVAL", "0.005"))
+TOP_ALLOCATIONS = 10
+
+
+# Phase stack of the current asyncio task; child tasks copy the context and so share the list
+_TASK_PHASES: ContextVar[Optional[list[str]]] = ContextVar("debate_profile_phases", default=None)
+
+
+def _running_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:  # No event loop running in this thread
+        return None
+
+
+def enabled() -> bool:
+    return os.environ.get("DEBATE_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    alloc: int = 0
+    samples: int = 0
+
+
+class _PhaseCallbacks(BaseCallbackHandler):
+    """Opens "node:<name>" and "llm" phases from graph callbacks."""
+
+    # Async runs would otherwise call sync handlers on executor threads, away from the task
+    run_inline = True
+
+    def __init__(self, profiler: "Profiler"):
+        self.profiler = profiler
+        self.open: dict[Any, tuple] = {}
+
+    def on_chain_start(self, serialized: Any, inputs: Any, *, run_id, parent_run_id=None, name=None, metadata=None, **kwargs: Any) -> None:
+        # Only the outermost runnable of a node, not the node function or chains nested in it
+        if name and name == (metadata or {}).get("langgraph_node") and parent_run_id not in self.open:
+            self.open[run_id] = self.profiler.enter(f"node:{name}")
+
+    def on_chain_end(self, outputs: Any, *, run_id, **kwargs: Any) -> None:
+        if run_id in self.open:
+            self.profiler.exit(self.open.pop(run_id))
+
+    def on_chain_error(self, error: BaseException, *, run_id, **kwargs: Any) -> None:
+        self.on_chain_end(None, run_id=run_id)
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id, **kwargs: Any) -> None:
+        self.open[run_id] = self.profiler.enter("llm")
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        # Chat models stream from a child task; register it so its samples see the "llm" phase
+        self.profiler._task_stack()
+
+    def on_llm_end(self, response: Any, *, run_id, **kwargs: Any) -> None:
+        if run_id in self.open:
+            self.profiler.exit(self.open.pop(run_id))
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs: Any) -> None:
+        self.on_llm_end(None, run_id=run_id)
+
+
+class Profiler:
+    def __init__(self, name: str = "debate", interval: float = SAMPLE_INTERVAL, out_dir: Optional[str] = None):
+        self.name = name
+        self.interval = interval
+        self.out_dir = Path(out_dir or os.environ.get("DEBATE_PROFILE_DIR") or Path("profiles") / time.strftime("%Y%m%d-%H%M%S"))
+        self.callbacks = _PhaseCallbacks(self)
+        self.stats: dict[str, PhaseStats] = defaultdict(PhaseStats)
+        self.allocations: list[tuple[str, list[str]]] = []
+        self._stacks: dict[int, list[str]] = {}  # threads outside an event loop
+        self._task_stacks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._loops: dict[int, asyncio.AbstractEventLoop] = {}
+        self._samples: dict[int, Counter] = defaultdict(Counter)
+        self._thread_names: dict[int, str] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+        self._t0 = 0.0
+        self.duration = 0.0
+
+    # ── Lifecycle ───────────────────────────────────────────────────────
+    def start(self) -> "Profiler":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._snapshot = tracemalloc.take_snapshot()
+        self._t0 = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self) -> Path:
+        """Stop sampling and write all outputs; returns the output directory."""
+        self.duration = time.perf_counter() - self._t0
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.write()
+        return self.out_dir
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ── Phases ──────────────────────────────────────────────────────────
+    def _task_stack(self) -> Optional[list[str]]:
+        """The running asyncio task's phase stack, registered for the sampler; None outside a loop."""
+        task = _running_task()
+        if task is None:
+            return None
+        stack = _TASK_PHASES.get()
+        if stack is None:
+            stack = []
+            _TASK_PHASES.set(stack)
+        self._task_stacks[task] = stack
+        self._loops[threading.get_ident()] = task.get_loop()
+        return stack
+
+    def enter(self, name: str) -> tuple:
+        tid = threading.get_ident()
+        stack = self._task_stack()
+        if stack is None:
+            stack = self._stacks.setdefault(tid, [])
+        else:
+            tid = None  # Other tasks share the loop's thread, so its CPU time isn't ours
+        stack.append(name)
+        return (name, tid, stack, time.perf_counter(), time.thread_time(), tracemalloc.get_traced_memory()[0])
+
+    def exit(self, token: tuple) -> None:
+        name, tid, stack, t0, c0, m0 = token
+        stats = self.stats[name]
+        stats.calls += 1
+        stats.wall += time.perf_counter() - t0
+        # thread_time is per-thread; callbacks may close a phase on another thread
+        if tid == threading.get_ident():
+            stats.cpu += time.thread_time() - c0
+        stats.alloc += tracemalloc.get_traced_memory()[0] - m0
+        if name in stack:
+            del stack[len(stack) - 1 - stack[::-1].index(name)]
+        if name.startswith("node:"):
+            self._diff_snapshot(name)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        token = self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit(token)
+
+    def iterate(self, iterable: Iterable, wait: str = "graph step", body: str = "render") -> Iterator:
+        """Yield from ``iterable``, timing each wait for an item as ``wait`` and
+        the consumer's loop body as ``body``."""
+        it = iter(iterable)
+        while True:
+            with self.phase(wait):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            with self.phase(body):
+                yield item
+
+    def _diff_snapshot(self, name: str) -> None:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        if self._snapshot is not None:
+            top = snapshot.compare_to(self._snapshot, "lineno")[:TOP_ALLOCATIONS]
+            self.allocations.append((name, [str(stat) for stat in top]))
+        self._snapshot = snapshot
+
+    # ── Sampling ────────────────────────────────────────────────────────
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                loop = self._loops.get(tid)
+                if loop is not None and loop.is_running():
+                    # An event loop thread: the phases of whichever task is running right now
+                    task = asyncio.current_task(loop)
+                    phases = list(self._task_stacks.get(task, ())) if task is not None else ["(loop idle)"]
+                else:
+                    phases = list(self._stacks.get(tid, ()))
+                self._samples[tid][tuple(phases + stack[::-1])] += 1
+                self._thread_names[tid] = names.get(tid, str(tid))
+                self.stats[phases[-1] if phases else "(outside phases)"].samples += 1
+
+    # ── Output ──────────────────────────────────────────────────────────
+    def summary_table(self) -> str:
+        total_samples = sum(s.samples for s in self.stats.values()) or 1
+        rows = [f"{'phase':<18} {'calls':>7} {'wall s':>9} {'cpu s':>8} {'alloc KiB':>10} {'samples':>8} {'%':>6}"]
+        for name, s in sorted(self.stats.items(), key=lambda kv: -kv[1].wall):
+            rows.append(
+                f"{name:<18} {s.calls:>7} {s.wall:>9.3f} {s.cpu:>8.3f} {s.alloc / 1024:>10.1f} "
+                f"{s.samples:>8} {100 * s.samples / total_samples:>5.1f}%"
+            )
+        rows.append(f"total wall {self.duration:.3f}s, sample interval {self.interval * 1000:.1f}ms")
+        return "\n".join(rows)
+
+    def write(self) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        with (self.out_dir / "profile.collapsed").open("w", encoding="utf-8") as f:
+            for tid, samples in self._samples.items():
+                root = self._thread_names.get(tid, str(tid)).replace(";", ":")
+                for stack, count in samples.items():
+                    f.write(";".join((root, *(s.replace(";", ":") for s in stack))) + f" {count}\n")
+
+        frames: dict[str, int] = {}
+        profiles = []
+        weight = self.interval * 1000
+        for tid, samples in self._samples.items():
+            stacks = [[frames.setdefault(s, len(frames)) for s in stack] for stack in samples]
+            counts = list(samples.values())
+            profiles.append({
+                "type": "sampled",
+                "name": self._thread_names.get(tid, str(tid)),
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(counts) * weight,
+                "samples": [s for s, n in zip(stacks, counts) for _ in range(n)],
+                "weights": [weight] * sum(counts),
+            })
+        with (self.out_dir / "profile.speedscope.json").open("w", encoding="utf-8") as f:
+            json.dump({
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": self.name,
+                "exporter": "ai-debate-club profiling.py",
+                "activeProfileIndex": 0,
+                "shared": {"frames": [{"name": name} for name in frames]},
+                "profiles": profiles,
+            }, f)
+
+        (self.out_dir / "summary.txt").write_text(self.summary_table() + "\n", encoding="utf-8")
+        with (self.out_dir / "allocations.txt").open("w", encoding="utf-8") as f:
+            for name, lines in self.allocations:
+                f.write(f"== {name}\n" + "\n".join(lines) + "\n\n")
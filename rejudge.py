@@ -0,0 +1,305 @@
+"""
+Batch re-judging of stored debate transcripts.
+
+Streams transcripts from disk, rebuilds the moderator inputs, runs them through
+a bounded pool of concurrent moderator calls and appends one structured verdict
+per transcript to a JSONL file. Re-running with the same output file resumes
+where the previous run stopped; identical moderator requests are served from
+an on-disk response cache.
+
+    python rejudge.py transcripts.jsonl -o verdicts.jsonl
+    python rejudge.py transcripts/ -o verdicts.jsonl --prompt-file new_moderator.txt -j 32
+
+Input is either a JSONL file with one transcript per line or a directory of
+``*.json`` / ``*.jsonl`` files. A transcript uses the shape returned by
+``GET /debates/{id}`` in server.py::
+
+    {"id": ..., "topic": ..., "pro_persona": ..., "con_persona": ...,
+     "messages": [{"speaker": "pro", "content": ..., "round": 1}, ...]}
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from agents.moderator_agent import (
+    MODERATOR_SYSTEM_PROMPT,
+    build_moderator_prompt,
+    moderator_inputs,
+    parse_verdict,
+)
+from debate_state import DebateState, initial_state
+from llm import get_llm
+import profiling
+
+
+# ----------------------------
+# Input
+# ----------------------------
+def iter_transcripts(path: Path, on_error: Optional[Callable[[str, Exception], None]] = None,
+                     exclude: Iterable[Path] = ()) -> Iterator[dict]:
+    """Lazily yield transcripts from a JSONL file or a directory of JSON/JSONL files.
+
+    Unreadable files and malformed lines are reported to ``on_error`` with their
+    ``file:line`` location and skipped, so one bad record can't stop a batch.
+    Files in ``exclude`` (the verdict output) are never read as transcripts.
+    """
+    def parse(raw: str, where: str) -> Optional[dict]:
+        try:
+            transcript = json.loads(raw)
+            if not isinstance(transcript, dict):
+                raise ValueError(f"expected a JSON object, got {type(transcript).__name__}")
+            return transcript
+        except ValueError as e:
+            if on_error:
+                on_error(where, e)
+            return None
+
+    excluded = {p.resolve() for p in exclude}
+    if path.is_dir():
+        files = sorted(p for p in path.iterdir() if p.suffix in (".json", ".jsonl") and p.resolve() not in excluded)
+    else:
+        files = [path]
+    for file in files:
+        try:
+            with file.open(encoding="utf-8") as f:
+                if file.suffix == ".json":
+                    records = [(f.read(), str(file))]
+                else:
+                    records = ((line, f"{file}:{n}") for n, line in enumerate(f, 1) if line.strip())
+                for raw, where in records:
+                    transcript = parse(raw, where)
+                    if transcript is not None:
+                        yield transcript
+        except (OSError, UnicodeDecodeError) as e:
+            if on_error:
+                on_error(str(file), e)
+
+
+def transcript_id(transcript: dict) -> str:
+    if transcript.get("id"):
+        return str(transcript["id"])
+    # Stored without an id: derive a stable one from the content
+    return hashlib.sha256(json.dumps(transcript, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def transcript_state(transcript: dict) -> DebateState:
+    """Rebuild the DebateState the moderator would have seen at the end of the debate.
+
+    Raises ValueError for a transcript with no pro or con turns, which has nothing to judge.
+    """
+    turns = [m for m in transcript.get("messages", []) if m.get("speaker") in ("pro", "con")]
+    if not turns:
+        raise ValueError("transcript has no pro or con turns")
+    state = initial_state(
+        transcript.get("topic", ""),
+        transcript.get("max_rounds", 0),
+        transcript.get("pro_persona") or "Pro",
+        transcript.get("con_persona") or "Con",
+    )
+    for m in turns:
+        state[f"{m['speaker']}_argument"] = m["content"]
+    state["chat_history"] = [HumanMessage(content=m["content"]) for m in turns]
+    return state
+
+
+# ----------------------------
+# Response cache
+# ----------------------------
+class ResponseCache:
+    """sqlite-backed map from a request hash to the moderator's raw response."""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT)")
+
+    def get(self, key: str) -> str | None:
+        row = self.db.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, content: str) -> None:
+        self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, content))
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+class Progress:
+    def __init__(self, every: float):
+        self.every = every
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.done = self.skipped = self.failed = self.cache_hits = 0
+        self.llm_seconds = 0.0
+
+    def line(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        return (
+            f"done={self.done} skipped={self.skipped} failed={self.failed} "
+            f"cache_hits={self.cache_hits} elapsed={elapsed:.1f}s rate={rate:.2f}/s "
+            f"avg_llm={self.llm_seconds / max(self.done - self.cache_hits, 1):.2f}s"
+        )
+
+    def tick(self) -> None:
+        now = time.perf_counter()
+        if now - self.last >= self.every:
+            self.last = now
+            print(self.line(), file=sys.stderr, flush=True)
+
+
+def completed_ids(output: Path) -> set[str]:
+    """Ids already written to the output file, so a rerun can resume."""
+    if not output.exists():
+        return set()
+    done = set()
+    with output.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue  # Truncated final line from an interrupted run
+    return done
+
+
+async def judge(transcript: dict, chain, prompt_hash: str, cache: ResponseCache, progress: Progress, retries: int,
+                config: Optional[RunnableConfig] = None) -> dict:
+    state = transcript_state(transcript)
+    inputs = moderator_inputs(state)
+    messages = chain.first.format_messages(**inputs)  # the prompt half of prompt | llm
+    key = hashlib.sha256(
+        (prompt_hash + json.dumps([m.content for m in messages])).encode()
+    ).hexdigest()
+
+    started = time.perf_counter()
+    content = cache.get(key)
+    cached = content is not None
+    if not cached:
+        for attempt in range(retries + 1):
+            try:
+                content = (await chain.ainvoke(inputs, config)).content
+                break
+            except Exception:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+        cache.put(key, content)
+        progress.llm_seconds += time.perf_counter() - started
+    else:
+        progress.cache_hits += 1
+
+    verdict = parse_verdict(content, state["pro_persona"], state["con_persona"])
+    winner_persona = {"pro": state["pro_persona"], "con": state["con_persona"]}.get(verdict.winner)
+    return {
+        "id": transcript_id(transcript),
+        "topic": state["topic"],
+        "pro_persona": state["pro_persona"],
+        "con_persona": state["con_persona"],
+        **asdict(verdict),
+        "winner_persona": winner_persona,
+        "verdict": content,
+        "prompt_hash": prompt_hash,
+        "cached": cached,
+        "latency_s": round(time.perf_counter() - started, 3),
+    }
+
+
+async def run_pipeline(args: argparse.Namespace, config: Optional[RunnableConfig] = None) -> Progress:
+    system_prompt = Path(args.prompt_file).read_text(encoding="utf-8") if args.prompt_file else MODERATOR_SYSTEM_PROMPT
+    llm = get_llm()
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or llm._llm_type
+    # Cache keys cover prompt and model, so a revised prompt or model never hits stale responses
+    prompt_hash = hashlib.sha256(f"{model}\n{system_prompt}".encode()).hexdigest()[:16]
+    chain = build_moderator_prompt(system_prompt) | llm
+
+    output = Path(args.output)
+    skip = completed_ids(output)
+    cache = ResponseCache(args.cache)
+    progress = Progress(args.progress_every)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+
+    def bad_input(where: str, error: Exception) -> None:
+        progress.failed += 1
+        print(f"skipped unreadable transcript at {where}: {error}", file=sys.stderr, flush=True)
+
+    async def produce():
+        queued = 0
+        for transcript in iter_transcripts(Path(args.input), bad_input, exclude=[output]):
+            if args.limit and queued >= args.limit:
+                break
+            tid = transcript_id(transcript)
+            if tid in skip:
+                progress.skipped += 1
+                continue
+            # Also dedupes repeated ids within this input
+            skip.add(tid)
+            await queue.put(transcript)
+            queued += 1
+        for _ in range(args.concurrency):
+            await queue.put(None)
+
+    async def work(out):
+        while (transcript := await queue.get()) is not None:
+            try:
+                record = await judge(transcript, chain, prompt_hash, cache, progress, args.retries, config)
+            except Exception as e:
+                progress.failed += 1
+                print(f"failed {transcript_id(transcript)}: {e}", file=sys.stderr, flush=True)
+                continue
+            # One line per verdict, flushed immediately so a crash loses at most the in-flight work
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            progress.done += 1
+            progress.tick()
+
+    try:
+        with output.open("a", encoding="utf-8") as out:
+            await asyncio.gather(produce(), *(work(out) for _ in range(args.concurrency)))
+    finally:
+        cache.close()
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="transcript JSONL file or directory")
+    parser.add_argument("-o", "--output", default="verdicts.jsonl", help="JSONL file to append verdicts to")
+    parser.add_argument("--prompt-file", help="replacement moderator system prompt")
+    parser.add_argument("-j", "--concurrency", type=int, default=8, help="concurrent moderator calls")
+    parser.add_argument("--cache", default=os.environ.get("REJUDGE_CACHE", ".rejudge_cache.sqlite"))
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=0, help="judge at most N new transcripts")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between progress lines")
+    parser.add_argument("--profile", action="store_true", default=profiling.enabled(),
+                        help="profile the run (also DEBATE_PROFILE=1); see profiling.py")
+    args = parser.parse_args()
+
+    if not args.profile:
+        progress = asyncio.run(run_pipeline(args))
+    else:
+        with profiling.Profiler("rejudge") as prof:
+            progress = asyncio.run(run_pipeline(args, {"callbacks": [prof.callbacks]}))
+        print(prof.summary_table(), file=sys.stderr)
+        print(f"profile written to {prof.out_dir}", file=sys.stderr)
+    print(progress.line(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Headless API server for AI Debate Club.
+
+Runs the same LangGraph debate as the Streamlit app on an asyncio event loop
+and streams tokens over Server-Sent Events or WebSocket.
+
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST /debates                  start a debate, returns its id
+    POST /debates/{id}/cancel      stop a queued or running debate
+    GET  /debates/{id}             debate status + transcript
+    GET  /debates/{id}/events      SSE stream of debate events
+    WS   /debates/{id}/ws          WebSocket stream of debate events
+
+The stream endpoints accept ``?cancel_on_disconnect=true`` to stop the debate
+(and its in-flight LLM request) when that client disconnects.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessageChunk
+from pydantic import BaseModel, Field, field_validator
+
+from agents.moderator_agent import judge_panel_specs
+from debate_state import initial_state
+from graph import graph_app
+
+# Debates allowed to stream at once; the rest wait in the queue
+MAX_CONCURRENT_DEBATES = int(os.environ.get("DEBATE_MAX_CONCURRENCY", "16"))
+# Finished debates kept in memory for transcript lookups
+MAX_STORED_DEBATES = int(os.environ.get("DEBATE_HISTORY_LIMIT", "1000"))
+# When set, completed transcripts are appended to <dir>/transcripts.jsonl (see rejudge.py)
+TRANSCRIPT_DIR = os.environ.get("DEBATE_TRANSCRIPT_DIR")
+# Largest judge panel a request may ask for
+MAX_JUDGES = int(os.environ.get("DEBATE_MAX_JUDGES", "7"))
+# Judge models a request may name: the specs configured in JUDGE_PANEL, if any
+ALLOWED_JUDGE_SPECS = {spec for spec in judge_panel_specs() if spec}
+
+
+class DebateRequest(BaseModel):
+    topic: str = Field(min_length=1)
+    pro_persona: str = "Pro"
+    con_persona: str = "Con"
+    max_rounds: int = Field(default=3, ge=1, le=10)
+    # Judge count or comma-separated model specs; falls back to JUDGE_PANEL (see moderator_agent)
+    judge_panel: str | None = None
+
+    @field_validator("judge_panel")
+    @classmethod
+    def _check_judge_panel(cls, value: str | None) -> str | None:
+        # Each judge is a billed model call: bound the count and only allow configured models
+        if value is None or not value.strip():
+            return None
+        specs = judge_panel_specs({"configurable": {"judge_panel": value}})
+        if len(specs) > MAX_JUDGES:
+            raise ValueError(f"at most {MAX_JUDGES} judges allowed")
+        unknown = sorted({spec for spec in specs if spec and spec not in ALLOWED_JUDGE_SPECS})
+        if unknown:
+            allowed = ", ".join(sorted(ALLOWED_JUDGE_SPECS)) or "none; use a judge count"
+            raise ValueError(f"judge models not allowed: {', '.join(unknown)} (allowed: {allowed})")
+        return value
+
+
+class Debate:
+    """In-memory record of one debate run and the events it has produced."""
+
+    def __init__(self, request: DebateRequest):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.pro_persona = request.pro_persona.strip() or "Pro"
+        self.con_persona = request.con_persona.strip() or "Con"
+        self.status = "queued"
+        self.messages: list[dict] = []
+        self.events: list[dict] = []
+        self.changed = asyncio.Condition()
+        self.task: asyncio.Task | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    async def emit(self, event: dict) -> None:
+        async with self.changed:
+            self.events.append(event)
+            self.changed.notify_all()
+
+    async def finish(self, status: str, event: dict) -> None:
+        """Record the terminal event and collapse the log for later replays."""
+        async with self.changed:
+            self.events.append(event)
+            self.status = status
+            # Followers already streaming keep reading the full list they started on
+            self.events = self._compacted()
+            self.changed.notify_all()
+
+    def _compacted(self) -> list[dict]:
+        # One token event per turn with its full text instead of one per token
+        messages = iter(self.messages)
+        events = []
+        for event in self.events:
+            if event["type"] == "token":
+                continue
+            events.append(event)
+            if event["type"] == "turn":
+                message = next(messages)
+                events.append({"type": "token", "speaker": message["speaker"], "text": message["content"]})
+        return events
+
+    async def follow(self):
+        """Yield every event from the start, then new ones until the debate ends."""
+        events = None
+        i = 0
+        while True:
+            async with self.changed:
+                if events is None:
+                    events = self.events
+                await self.changed.wait_for(lambda: i < len(events) or self.finished)
+                pending = events[i:]
+                done = self.finished
+            for event in pending:
+                yield event
+            i += len(pending)
+            if done and i >= len(events):
+                return
+
+    def transcript(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "topic": self.request.topic,
+            "pro_persona": self.pro_persona,
+            "con_persona": self.con_persona,
+            "max_rounds": self.request.max_rounds,
+            "messages": self.messages,
+        }
+
+
+app = FastAPI(title="AI Debate Club API")
+debates: OrderedDict[str, Debate] = OrderedDict()
+_slots: asyncio.Semaphore | None = None
+
+
+def _get_slots() -> asyncio.Semaphore:
+    # Created lazily so the semaphore binds to the server's running loop
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MAX_CONCURRENT_DEBATES)
+    return _slots
+
+
+def _save_transcript(debate: Debate) -> None:
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    with open(os.path.join(TRANSCRIPT_DIR, "transcripts.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(debate.transcript(), ensure_ascii=False) + "\n")
+
+
+def _evict_finished() -> None:
+    while len(debates) > MAX_STORED_DEBATES:
+        oldest = next((d for d in debates.values() if d.finished), None)
+        if oldest is None:
+            return
+        del debates[oldest.id]
+
+
+async def run_debate(debate: Debate) -> None:
+    """Drive the graph for one debate, recording turns and token events."""
+    state = initial_state(debate.request.topic, debate.request.max_rounds, debate.pro_persona, debate.con_persona)
+    personas = {"pro": debate.pro_persona, "con": debate.con_persona, "moderator": ""}
+    current = None
+    pro_turn = con_turn = 0
+
+    try:
+        async with _get_slots():
+            debate.status = "running"
+            await debate.emit({"type": "status", "status": "running"})
+            config = {"configurable": {"judge_panel": debate.request.judge_panel}} if debate.request.judge_panel else {}
+            async for mode, payload in graph_app.astream(state, config, stream_mode=["messages", "custom"]):
+                if mode == "custom":
+                    if payload.get("type") == "vote":
+                        await debate.emit(payload)
+                        continue
+                    if payload.get("type") != "verdict":
+                        continue
+                    node, token = "moderator", payload["content"]
+                else:
+                    chunk, metadata = payload
+                    node = metadata.get("langgraph_node", "")
+                    if node not in personas:
+                        continue
+                    if not isinstance(chunk, AIMessageChunk):
+                        continue
+                    token = chunk.content
+                    if not isinstance(token, str) or not token:
+                        continue
+
+                if current is None or node != current["speaker"]:
+                    if node == "pro":
+                        pro_turn += 1
+                    elif node == "con":
+                        con_turn += 1
+                    current = {
+                        "speaker": node,
+                        "content": "",
+                        "persona": personas[node],
+                        "round": pro_turn if node == "pro" else con_turn if node == "con" else 0,
+                    }
+                    debate.messages.append(current)
+                    await debate.emit({"type": "turn", **{k: v for k, v in current.items() if k != "content"}})
+
+                current["content"] += token
+                await debate.emit({"type": "token", "speaker": node, "text": token})
+
+            await debate.finish("done", {"type": "done"})
+            if TRANSCRIPT_DIR:
+                _save_transcript(debate)
+    except asyncio.CancelledError:
+        # Task cancellation propagates into the node's ainvoke and closes the provider stream
+        if current is not None:
+            current["interrupted"] = True
+        await debate.finish("cancelled", {"type": "cancelled"})
+        raise
+    except Exception as e:
+        await debate.finish("failed", {"type": "error", "detail": str(e)})
+    finally:
+        _evict_finished()
+
+
+def _cancel(debate: Debate) -> None:
+    if debate.task is not None and not debate.task.done():
+        debate.task.cancel()
+
+
+def _get_debate(debate_id: str) -> Debate:
+    debate = debates.get(debate_id)
+    if debate is None:
+        raise HTTPException(status_code=404, detail="Debate not found")
+    return debate
+
+
+@app.post("/debates", status_code=201)
+async def start_debate(request: DebateRequest) -> dict:
+    debate = Debate(request)
+    debates[debate.id] = debate
+    debate.task = asyncio.create_task(run_debate(debate))
+    return {"id": debate.id, "status": debate.status}
+
+
+@app.get("/debates/{debate_id}")
+async def get_debate(debate_id: str) -> dict:
+    return _get_debate(debate_id).transcript()
+
+
+@app.post("/debates/{debate_id}/cancel")
+async def cancel_debate(debate_id: str) -> dict:
+    debate = _get_debate(debate_id)
+    _cancel(debate)
+    return {"id": debate.id, "status": debate.status}
+
+
+@app.get("/debates/{debate_id}/events")
+async def stream_events(debate_id: str, cancel_on_disconnect: bool = False) -> StreamingResponse:
+    debate = _get_debate(debate_id)
+
+    async def sse():
+        try:
+            async for event in debate.follow():
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            # Runs when the client goes away mid-stream and Starlette closes the generator
+            if cancel_on_disconnect:
+                _cancel(debate)
+
+    return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.websocket("/debates/{debate_id}/ws")
+async def stream_ws(websocket: WebSocket, debate_id: str, cancel_on_disconnect: bool = False) -> None:
+    debate = debates.get(debate_id)
+    if debate is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    try:
+        async for event in debate.follow():
+            await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        if cancel_on_disconnect:
+            _cancel(debate)
+
+
+@app.get("/health")
+async def health() -> dict:
+    running = sum(1 for d in debates.values() if d.status == "running")
+    queued = sum(1 for d in debates.values() if d.status == "queued")
+    return {
+        "status": "ok",
+        "running": running,
+        "queued": queued,
+        "max_concurrency": MAX_CONCURRENT_DEBATES,
+        # Process CPU so far; loadtest.py diffs it to leave out import and startup
+        "cpu_seconds": time.process_time(),
+    }
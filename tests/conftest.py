@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Agents build their LLM at import time; point them at the offline fake provider first
+os.environ["DEBATE_FAKE_LLM"] = "1"
+os.environ["DEBATE_FAKE_LLM_DELAY"] = "0.01"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
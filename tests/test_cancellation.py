@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import llm
+import server
+from cancellation import CancelToken
+from debate_state import initial_state
+from graph import graph_app
+
+
+@pytest.fixture
+def produced(monkeypatch):
+    """Counts chunks the fake provider actually generates, on both sync and async paths."""
+    count = [0]
+    stream, astream = llm.FakeStreamingLLM._stream, llm.FakeStreamingLLM._astream
+
+    def counted_stream(self, *args, **kwargs):
+        for chunk in stream(self, *args, **kwargs):
+            count[0] += 1
+            yield chunk
+
+    async def counted_astream(self, *args, **kwargs):
+        async for chunk in astream(self, *args, **kwargs):
+            count[0] += 1
+            yield chunk
+
+    monkeypatch.setattr(llm.FakeStreamingLLM, "_stream", counted_stream)
+    monkeypatch.setattr(llm.FakeStreamingLLM, "_astream", counted_astream)
+    return count
+
+
+@pytest.fixture(autouse=True)
+def fresh_server():
+    # Each test runs its own event loop; don't reuse a semaphore bound to an old one
+    server._slots = None
+    server.debates.clear()
+    yield
+    server._slots = None
+    server.debates.clear()
+
+
+def test_sync_stream_stops_within_one_chunk(produced):
+    token = CancelToken()
+    stream = graph_app.stream(initial_state("Topic", 3, "A", "B"), {"callbacks": [token]}, stream_mode="messages")
+    with contextlib.closing(stream):
+        for seen, _ in enumerate(stream, 1):
+            if seen == 10:  # mid-way through the pro node
+                token.cancel()
+                at_cancel = produced[0]
+                break
+    after_close = produced[0] - at_cancel
+    time.sleep(0.2)
+
+    assert after_close <= 1
+    assert produced[0] - at_cancel == after_close  # nothing keeps generating in the background
+
+
+def test_async_task_cancel_keeps_partial_turn(produced):
+    async def scenario():
+        debate = server.Debate(server.DebateRequest(topic="Topic", max_rounds=3))
+        debate.task = asyncio.create_task(server.run_debate(debate))
+        while not (debate.messages and debate.messages[-1]["content"]):
+            await asyncio.sleep(0.01)
+        debate.task.cancel()
+        at_cancel = produced[0]
+        with pytest.raises(asyncio.CancelledError):
+            await debate.task
+        await asyncio.sleep(0.2)
+        return debate, produced[0] - at_cancel
+
+    debate, after_cancel = asyncio.run(scenario())
+
+    assert after_cancel <= 1
+    assert debate.status == "cancelled"
+    assert debate.events[-1] == {"type": "cancelled"}
+    assert debate.messages[-1]["interrupted"] is True
+    assert debate.messages[-1]["content"]
+    # The finished log keeps one token event per turn, carrying the turn's full text
+    tokens = [e for e in debate.events if e["type"] == "token"]
+    assert [t["text"] for t in tokens] == [m["content"] for m in debate.messages]
+
+
+def test_async_cancel_stops_judge_panel(produced):
+    turn = len(llm.FakeStreamingLLM()._tokens())
+
+    async def scenario():
+        debate = server.Debate(server.DebateRequest(topic="Topic", max_rounds=1, judge_panel="3"))
+        debate.task = asyncio.create_task(server.run_debate(debate))
+        while produced[0] < 2 * turn + 15:  # pro and con done, the three judges mid-verdict
+            await asyncio.sleep(0.01)
+        debate.task.cancel()
+        at_cancel = produced[0]
+        with pytest.raises(asyncio.CancelledError):
+            await debate.task
+        await asyncio.sleep(0.2)
+        return debate, produced[0] - at_cancel
+
+    debate, after_cancel = asyncio.run(scenario())
+
+    assert after_cancel <= 3  # at most one chunk per judge
+    assert debate.status == "cancelled"
+    assert not any(e["type"] in ("vote", "verdict") for e in debate.events)
+
+
+def test_cancel_endpoint(produced):
+    with TestClient(server.app) as client:
+        debate_id = client.post("/debates", json={"topic": "Topic", "max_rounds": 3}).json()["id"]
+        deadline = time.monotonic() + 10
+        while not client.get(f"/debates/{debate_id}").json()["messages"]:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        assert client.post(f"/debates/{debate_id}/cancel").status_code == 200
+        while client.get(f"/debates/{debate_id}").json()["status"] != "cancelled":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        at_cancel = produced[0]
+        time.sleep(0.2)
+        transcript = client.get(f"/debates/{debate_id}").json()
+        missing = client.post("/debates/missing/cancel")
+
+    assert produced[0] - at_cancel <= 1
+    assert transcript["messages"][-1]["interrupted"] is True
+    assert missing.status_code == 404
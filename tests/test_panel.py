@@ -0,0 +1,127 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from agents.moderator_agent import (
+    JudgeVote,
+    PanelResult,
+    arun_panel,
+    decided_winner,
+    merge_panel_verdict,
+    moderator_inputs,
+    moderator_prompt,
+    parse_verdict,
+    run_panel,
+)
+from debate_state import initial_state
+from llm import FakeStreamingLLM
+
+PRO, CON = "Socrates", "Elon Musk"
+FOR_PRO = "Socrates reasoned from evidence. Elon dodged the question. Both were civil.\nWinner: Pro\nConfidence: 80%"
+FOR_CON = "Elon was sharper on the numbers. Socrates leaned on anecdotes. It was close.\nWinner: Con\nConfidence: 60%"
+
+
+def judge(reply, delay):
+    return moderator_prompt | FakeStreamingLLM(reply=reply, token_delay=delay, streaming=True)
+
+
+@pytest.fixture
+def inputs():
+    state = initial_state("Topic", 1, PRO, CON)
+    state["pro_argument"], state["con_argument"] = "Pro case", "Con case"
+    return moderator_inputs(state)
+
+
+@pytest.fixture
+def judges():
+    # Two quick judges for Pro decide the majority long before the slow one for Con finishes
+    return [("fast-1", judge(FOR_PRO, 0.001)), ("fast-2", judge(FOR_PRO, 0.001)), ("slow", judge(FOR_CON, 0.2))]
+
+
+@pytest.mark.parametrize("counts, remaining, winner", [
+    (Counter(), 3, None),
+    (Counter(pro=2), 1, "pro"),
+    (Counter(pro=2), 2, None),
+    (Counter(pro=2, con=1), 0, "pro"),
+    (Counter(pro=1, con=1), 0, None),
+    (Counter(tie=3, con=1), 1, "tie"),
+])
+def test_decided_winner(counts, remaining, winner):
+    assert decided_winner(counts, remaining) == winner
+
+
+def test_run_panel_stops_the_rest_once_decided(judges, inputs):
+    result = run_panel(judges, inputs, PRO, CON)
+
+    assert result.winner == "pro"
+    assert result.calls_saved == 1
+    assert result.votes[2].stopped and result.votes[2].verdict is None
+    assert result.seconds < 2  # the slow judge alone would stream for ~8s
+
+
+def test_run_panel_without_early_stop_hears_everyone(judges, inputs):
+    judges[2] = ("slow", judge(FOR_CON, 0.001))
+    result = run_panel(judges, inputs, PRO, CON, early_stop=False)
+
+    assert result.winner == "pro"
+    assert result.calls_saved == 0
+    assert [v.verdict.winner for v in result.votes] == ["pro", "pro", "con"]
+
+
+def test_progress_is_reported_while_judges_run(inputs):
+    judges = [(f"judge-{i}", judge(FOR_PRO, 0.02)) for i in range(3)]
+    progress = []
+    run_panel(judges, inputs, PRO, CON, on_progress=progress.append)
+    aprogress = []
+    asyncio.run(arun_panel(judges, inputs, PRO, CON, on_progress=aprogress.append))
+
+    # Each judge streams for ~0.8s; PROGRESS_INTERVAL is 0.1s
+    assert len(progress) >= 3 and progress[0] == 0
+    assert len(aprogress) >= 3 and aprogress[0] == 0
+
+
+def test_arun_panel_cancels_the_rest_once_decided(judges, inputs):
+    voted = []
+    result = asyncio.run(arun_panel(judges, inputs, PRO, CON, on_vote=voted.append))
+
+    assert result.winner == "pro"
+    assert result.calls_saved == 1
+    assert sorted(v.judge for v in voted) == [1, 2]
+    assert result.seconds < 2
+
+
+def vote(judge_no, content):
+    return JudgeVote(judge=judge_no, label="default", verdict=parse_verdict(content, PRO, CON), content=content)
+
+
+def test_merge_majority_with_dissent_summary():
+    votes = [vote(1, FOR_PRO), vote(2, FOR_PRO), vote(3, FOR_CON)]
+    merged = merge_panel_verdict(PanelResult("pro", votes, 1.0), PRO, CON)
+
+    assert merged.startswith("Panel verdict: Socrates wins (2 of 3 judges).")
+    assert "Socrates reasoned from evidence." in merged
+    assert "Concurring: Judge 2." in merged
+    assert "Judge 3 (default), for Elon Musk: Elon was sharper on the numbers. Socrates leaned on anecdotes." in merged
+    assert "It was close." not in merged  # dissents are summarised, not pasted in full
+    assert merged.count("Socrates reasoned from evidence.") == 1
+    assert parse_verdict(merged, PRO, CON).winner == "pro"
+
+
+def test_merge_split_panel():
+    votes = [vote(1, FOR_PRO), vote(2, FOR_CON)]
+    merged = merge_panel_verdict(PanelResult("tie", votes, 1.0), PRO, CON)
+
+    assert merged.startswith("Panel verdict: Tie — the judges were split (1 for Socrates, 1 for Elon Musk).")
+    assert "Majority opinion" not in merged
+    assert parse_verdict(merged, PRO, CON).winner == "tie"
+
+
+def test_merge_undecided_panel():
+    votes = [vote(1, "Both made fair points."), vote(2, "Hard to say.")]
+    merged = merge_panel_verdict(PanelResult(None, votes, 1.0), PRO, CON)
+
+    assert merged.startswith("Panel verdict: undecided")
+    assert "split" not in merged
+    assert "Winner: Undecided" in merged
+    assert parse_verdict(merged, PRO, CON).winner is None
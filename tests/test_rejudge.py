@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import json
+
+import pytest
+
+import rejudge
+
+
+def transcript(debate_id, turns=True):
+    messages = [
+        {"speaker": "pro", "content": f"Pro case {debate_id}", "round": 1},
+        {"speaker": "con", "content": f"Con case {debate_id}", "round": 1},
+    ]
+    return {"id": debate_id, "topic": "Topic", "pro_persona": "A", "con_persona": "B", "messages": messages if turns else []}
+
+
+def run(tmp_path, source, output="verdicts.jsonl"):
+    args = argparse.Namespace(
+        input=str(source), output=str(tmp_path / output), prompt_file=None, concurrency=4,
+        cache=str(tmp_path / "cache.sqlite"), retries=0, limit=0, progress_every=60,
+    )
+    return asyncio.run(rejudge.run_pipeline(args))
+
+
+def read_ids(path):
+    return [json.loads(line)["id"] for line in path.read_text().splitlines()]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "transcripts.jsonl"
+    lines = [json.dumps(transcript("a")), "{not json", json.dumps(transcript("b")),
+             json.dumps(transcript("a")), json.dumps(transcript("empty", turns=False))]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_bad_records_are_counted_not_fatal(tmp_path, source, capsys):
+    progress = run(tmp_path, source)
+
+    assert sorted(read_ids(tmp_path / "verdicts.jsonl")) == ["a", "b"]
+    assert progress.done == 2
+    assert progress.failed == 2  # the malformed line and the transcript without turns
+    assert progress.skipped == 1  # the repeated id
+    assert f"{source}:2" in capsys.readouterr().err
+
+
+def test_rerun_resumes(tmp_path, source):
+    run(tmp_path, source)
+    progress = run(tmp_path, source)
+
+    assert progress.done == 0
+    assert progress.skipped == 3
+    assert len(read_ids(tmp_path / "verdicts.jsonl")) == 2
+
+
+def test_new_output_is_served_from_cache(tmp_path, source):
+    run(tmp_path, source)
+    progress = run(tmp_path, source, output="again.jsonl")
+
+    records = [json.loads(line) for line in (tmp_path / "again.jsonl").read_text().splitlines()]
+    assert progress.cache_hits == 2
+    assert all(r["cached"] for r in records)
+
+
+def test_directory_input_skips_the_output_file(tmp_path):
+    folder = tmp_path / "transcripts"
+    folder.mkdir()
+    (folder / "one.json").write_text(json.dumps(transcript("a")))
+    (folder / "more.jsonl").write_text(json.dumps(transcript("b")) + "\n")
+
+    run(tmp_path, folder, output="transcripts/verdicts.jsonl")
+    progress = run(tmp_path, folder, output="transcripts/verdicts.jsonl")
+
+    assert sorted(read_ids(folder / "verdicts.jsonl")) == ["a", "b"]
+    assert (progress.done, progress.failed, progress.skipped) == (0, 0, 2)
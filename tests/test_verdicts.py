@@ -0,0 +1,65 @@
+import pytest
+
+from agents.moderator_agent import VERDICT_FORMAT, build_moderator_prompt, parse_verdict
+
+PRO, CON = "Socrates", "Elon Musk"
+
+
+@pytest.mark.parametrize("text, winner", [
+    ("A close debate.\nWinner: Pro\nConfidence: 70%", "pro"),
+    ("A close debate.\nWinner: Con", "con"),
+    ("A close debate.\n**Winner:** Tie", "tie"),
+    ("A close debate.\nWinner: Elon Musk", "con"),
+    ('{"winner": "Socrates", "confidence": 0.8}', "pro"),
+    ("Nobody won anything here.", None),
+])
+def test_winner_line(text, winner):
+    assert parse_verdict(text, PRO, CON).winner == winner
+
+
+def test_persona_aliases():
+    pro, con = "Dwayne Johnson (The Rock)", "Socrates"
+    assert parse_verdict("Winner: The Rock", pro, con).winner == "pro"
+    assert parse_verdict("Winner: Johnson", pro, con).winner == "pro"
+    # A word both personas share names neither of them
+    assert parse_verdict("Winner: John Doe", "John Smith", "John Doe").winner == "con"
+
+
+@pytest.mark.parametrize("text, winner", [
+    ("Elon made strong points but the winner is Socrates.", "pro"),
+    ("Socrates wins over Elon.", "pro"),
+    ("Elon wins over Socrates, clearly.", "con"),
+    ("In the end it was a draw; no clear winner.", "tie"),
+])
+def test_free_text_winner_is_the_name_next_to_the_keyword(text, winner):
+    assert parse_verdict(text, PRO, CON).winner == winner
+
+
+def test_fallacies_line_takes_precedence():
+    text = "Elon accused Socrates of a straw man, unfairly.\nFallacies: ad hominem, Slippery-slope\nWinner: Pro"
+    assert parse_verdict(text, PRO, CON).fallacies == ["ad hominem", "slippery slope"]
+    assert parse_verdict("Pro used a straw man.\nFallacies: None\nWinner: Con", PRO, CON).fallacies == []
+
+
+def test_free_text_fallacies_skip_negated_sentences():
+    text = "No ad hominem was used. Elon relied on a straw man. Socrates wins."
+    assert parse_verdict(text, PRO, CON).fallacies == ["straw man"]
+
+
+@pytest.mark.parametrize("text, confidence", [
+    ("Winner: Pro\nConfidence: 85%", 0.85),
+    ("Winner: Pro\nConfidence: 0.6", 0.6),
+    ("I have no confidence 5 times over in Elon's data.\nWinner: Pro\nConfidence: 90%", 0.9),
+    ("Winner: Pro", None),
+])
+def test_confidence_uses_last_match(text, confidence):
+    expected = None if confidence is None else pytest.approx(confidence)
+    assert parse_verdict(text, PRO, CON).confidence == expected
+
+
+def test_custom_prompt_keeps_the_verdict_format():
+    system = build_moderator_prompt("Judge harshly, {pro_persona} vs {con_persona}.").format_messages(
+        topic="T", pro_argument="a", con_argument="b", pro_persona=PRO, con_persona=CON,
+    )[0].content
+    assert system.startswith("Judge harshly, Socrates vs Elon Musk.")
+    assert system.rstrip().endswith(VERDICT_FORMAT.strip())